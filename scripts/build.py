@@ -2,12 +2,16 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import copy
+import hashlib
+import html
 import json
 import os
 import re
 import shutil
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union
 
@@ -40,11 +44,57 @@ CRITICAL_LIGHT_BG = os.getenv("I18N_CRITICAL_LIGHT_BG", "#f8fafc")
 # ✅ 语言目录不复制的文件（CNAME 只留根目录）
 EXCLUDE_FILENAMES_IN_LANG_DIRS = {"CNAME"}
 
+# ✅ 并发构建进程数（语言之间互相独立，可并行渲染）
+# 1 = 串行；默认用满 CPU：I18N_BUILD_WORKERS=4 python3 scripts/build.py
+BUILD_WORKERS = int(os.getenv("I18N_BUILD_WORKERS", str(os.cpu_count() or 1)))
+
+# ✅ 单个语言内的文件写入/复制线程数（纯 IO，线程即可重叠磁盘延迟）
+IO_WORKERS = int(os.getenv("I18N_IO_WORKERS", "8"))
+
+# ✅ 静态资源用硬链接代替复制（同一文件系统内零拷贝；失败自动回退 copy2）
+HARDLINK_ASSETS = os.getenv("I18N_HARDLINK_ASSETS", "1") == "1"
+
+# ✅ 增量模式：不清空 docs，未变化的静态文件直接跳过（按 size+mtime / 同 inode 判断）
+# 注意：增量模式不会清理已删除语言/文件的残留，发布前建议跑一次全量
+INCREMENTAL = os.getenv("I18N_INCREMENTAL", "0") == "1"
+
+# 增量模式下记录 (源文件, locale, 配置) 的渲染签名，命中则连渲染都跳过
+RENDER_SIG_DIR = PROJECT_ROOT / ".cache" / "i18n_render"
+
 try:
     from bs4 import BeautifulSoup  # type: ignore
 except Exception:
     raise SystemExit("缺少依赖：pip install beautifulsoup4")
 
+# ✅ 三种标记合成一个选择器，整棵树只过一遍（selectolax 路径用）
+I18N_SELECTOR = "[data-i18n], [data-i18n-html], [data-i18n-attr]"
+
+# ✅ 优先用 lxml（C 实现，解析/序列化比 html.parser 快一个量级）；没装则回退
+try:
+    import lxml  # noqa: F401  # pip install lxml
+    BS4_PARSER = "lxml"
+except Exception:
+    BS4_PARSER = "html.parser"
+
+# ✅ 首选 selectolax（Lexbor，C 实现），比 BS4+lxml 还快一个量级；
+#    没装或 I18N_USE_BS4=1 时回退到 BS4 路径
+try:
+    from selectolax.lexbor import LexborHTMLParser  # type: ignore  # pip install selectolax
+except Exception:
+    LexborHTMLParser = None
+
+USE_BS4 = os.getenv("I18N_USE_BS4", "0") == "1"
+
+# ✅ orjson（C 实现）解析 locale/languages 明显快于 stdlib json；没装则回退
+try:
+    import orjson  # type: ignore  # pip install orjson
+except Exception:
+    orjson = None
+
+
+def json_loads_bytes(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
 
 # =========================
 # utils
@@ -80,8 +130,9 @@ class LangSpec:
     html_lang: str
 
 
+@lru_cache(maxsize=None)
 def load_languages() -> List[LangSpec]:
-    raw = json.loads(LANGS_FILE.read_text(encoding="utf-8"))
+    raw = json_loads_bytes(LANGS_FILE.read_bytes())
     out: List[LangSpec] = []
     for x in raw:
         code = (x.get("code") or "").strip()
@@ -110,14 +161,24 @@ def load_languages() -> List[LangSpec]:
 JsonObj = Union[Dict[str, Any], List[Any], str, int, float, bool, None]
 
 
+@lru_cache(maxsize=None)
 def read_json(path: Path) -> JsonObj:
-    return json.loads(path.read_text(encoding="utf-8"))
+    # 同一个 locale 文件会被多个语言当 fallback 反复读（典型：base 层），缓存解析结果。
+    # 返回对象全程只读，勿原地修改。
+    return json_loads_bytes(path.read_bytes())
 
 
 def locale_file_for(code: str) -> Path:
     return LOCALES_DIR / f"{norm_code(code)}.json"
 
 
+@lru_cache(maxsize=None)
+def _split_key(key: str) -> Tuple[Tuple[str, Optional[int]], ...]:
+    # 同一批 key 会对每层/每个语言反复 deep_get，切分结果缓存起来；
+    # 数字段顺带预转 int，走 list 下标时不用每次 isdigit()+int()
+    return tuple((p, int(p) if p.isdigit() else None) for p in key.split("."))
+
+
 def deep_get(obj: Any, key: str) -> Optional[Any]:
     if obj is None:
         return None
@@ -125,18 +186,16 @@ def deep_get(obj: Any, key: str) -> Optional[Any]:
         return obj[key]
 
     cur: Any = obj
-    parts = key.split(".")
-    for p in parts:
-        if isinstance(cur, dict):
+    for p, idx in _split_key(key):
+        # locale 数据只有纯 dict/list/标量，type() 精确比较比 isinstance 快
+        t = type(cur)
+        if t is dict:
             if p in cur:
                 cur = cur[p]
             else:
                 return None
-        elif isinstance(cur, list):
-            if not p.isdigit():
-                return None
-            idx = int(p)
-            if idx < 0 or idx >= len(cur):
+        elif t is list:
+            if idx is None or idx >= len(cur):
                 return None
             cur = cur[idx]
         else:
@@ -144,13 +203,36 @@ def deep_get(obj: Any, key: str) -> Optional[Any]:
     return cur
 
 
+def _flatten_layer_into(flat: Dict[str, Any], obj: Any, prefix: str) -> None:
+    """把一层 locale 压平写进 flat（已有 key 不覆盖 = 先到先得）。
+
+    路径语法与 deep_get 一致：dict 用 "."，list 下标也用 "."（如 "items.0"）；
+    平铺文件的 key（含 "." 或 "[0]"）本身就是 dict key，原样保留。
+    """
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            _flatten_layer_into(flat, v, f"{prefix}.{k}" if prefix else str(k))
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            _flatten_layer_into(flat, v, f"{prefix}.{i}" if prefix else str(i))
+    elif prefix and obj is not None and prefix not in flat:
+        flat[prefix] = obj
+
+
 def merge_locales_prefer_first(dicts: List[JsonObj]) -> Dict[str, Any]:
-    return {"__layers__": dicts}
+    # 加载时一次性压平所有层：查 key 从“逐层 deep_get 遍历”变成一次 dict.get
+    flat: Dict[str, Any] = {}
+    for layer in dicts:
+        _flatten_layer_into(flat, layer, "")
+    return {"__layers__": dicts, "__flat__": flat}
 
 
 def locale_lookup(merged: Dict[str, Any], key: str) -> Optional[Any]:
-    layers = merged.get("__layers__") or []
-    for layer in layers:
+    v = merged["__flat__"].get(key)
+    if v is not None:
+        return v
+    # 兜底：个别非叶子 key（指向整段子树）仍走原来的逐层 deep_get
+    for layer in merged.get("__layers__") or []:
         v = deep_get(layer, key)
         if v is not None:
             return v
@@ -186,11 +268,9 @@ def load_locale_with_fallbacks(code: str, fallbacks: List[str], base_code: str)
 _VAR_RE = re.compile(r"\{([a-zA-Z_][a-zA-Z0-9_]*)\}")
 
 
-def format_vars(text: str, vars_map: Dict[str, str]) -> str:
-    if not text:
-        return text
-    if text.strip() in EXEMPT_LITERALS:
-        return text
+@lru_cache(maxsize=None)
+def _format_vars_cached(text: str, vars_items: Tuple[Tuple[str, str], ...]) -> str:
+    vars_map = dict(vars_items)
 
     def repl(m: re.Match) -> str:
         k = m.group(1)
@@ -199,6 +279,16 @@ def format_vars(text: str, vars_map: Dict[str, str]) -> str:
     return _VAR_RE.sub(repl, text)
 
 
+def format_vars(text: str, vars_map: Dict[str, str]) -> str:
+    # 同一段文案会在每个文件/每个语言里反复插值，缓存结果（vars_map 转 tuple 做 key）
+    if not text or "{" not in text:
+        # 绝大多数文案没有占位符，直接短路，连正则都不用跑
+        return text
+    if text.strip() in EXEMPT_LITERALS:
+        return text
+    return _format_vars_cached(text, tuple(sorted(vars_map.items())))
+
+
 # =========================
 # ✅ 防暗色首帧闪白 + ✅ 地址栏 theme-color 自适应兜底
 # =========================
@@ -210,38 +300,22 @@ def ensure_critical_head(soup: BeautifulSoup, dark_bg: str, light_bg: str) -> No
     if head.find("meta", attrs={"name": "i18n-critical-head"}):
         return
 
-    marker = soup.new_tag("meta")
-    marker["name"] = "i18n-critical-head"
-    marker["content"] = "1"
-
-    cs = soup.new_tag("meta")
-    cs["name"] = "color-scheme"
-    cs["content"] = "dark light"
-
-    style = soup.new_tag("style")
-    style.string = (
-        f":root{{color-scheme:dark light;}}"
-        f"html,body{{margin:0;min-height:100vh;background:{dark_bg};}}"
-        f"@media (prefers-color-scheme: light){{html,body{{background:{light_bg};}}}}"
-    )
+    # 模板只构建/解析一次，每个文档插入 deepcopy，省掉逐个 new_tag + 赋属性
+    for node in reversed(_critical_head_template(dark_bg, light_bg)):
+        head.insert(0, copy.deepcopy(node))
 
-    theme_dark = soup.new_tag("meta")
-    theme_dark["name"] = "theme-color"
-    theme_dark["media"] = "(prefers-color-scheme: dark)"
-    theme_dark["content"] = dark_bg
 
-    theme_light = soup.new_tag("meta")
-    theme_light["name"] = "theme-color"
-    theme_light["media"] = "(prefers-color-scheme: light)"
-    theme_light["content"] = light_bg
+@lru_cache(maxsize=None)
+def _critical_head_template(dark_bg: str, light_bg: str) -> Tuple[Any, ...]:
+    frag = BeautifulSoup(critical_head_html(dark_bg, light_bg), BS4_PARSER)
+    container = frag.head or frag.body or frag  # lxml 会包一层 html/head，html.parser 不会
+    return tuple(c for c in container.contents if getattr(c, "name", None))
 
-    theme_fallback = soup.new_tag("meta")
-    theme_fallback["name"] = "theme-color"
-    theme_fallback["content"] = dark_bg
-    theme_fallback["id"] = "themeColorFallback"
 
-    js = soup.new_tag("script")
-    js.string = (
+@lru_cache(maxsize=None)
+def critical_head_html(dark_bg: str, light_bg: str) -> str:
+    """注入 head 的关键标签，预先拼成一份原始 HTML 串（两条渲染路径共用）"""
+    js = (
         "(function(){"
         "var el=document.getElementById('themeColorFallback');"
         "if(!el||!window.matchMedia) return;"
@@ -253,25 +327,37 @@ def ensure_critical_head(soup: BeautifulSoup, dark_bg: str, light_bg: str) -> No
         "else if(mq.addListener) mq.addListener(apply);"
         "})();"
     )
-
-    head.insert(0, js)
-    head.insert(0, theme_fallback)
-    head.insert(0, theme_light)
-    head.insert(0, theme_dark)
-    head.insert(0, style)
-    head.insert(0, cs)
-    head.insert(0, marker)
+    return (
+        '<meta name="i18n-critical-head" content="1"/>'
+        '<meta name="color-scheme" content="dark light"/>'
+        "<style>"
+        f":root{{color-scheme:dark light;}}"
+        f"html,body{{margin:0;min-height:100vh;background:{dark_bg};}}"
+        f"@media (prefers-color-scheme: light){{html,body{{background:{light_bg};}}}}"
+        "</style>"
+        f'<meta name="theme-color" media="(prefers-color-scheme: dark)" content="{dark_bg}"/>'
+        f'<meta name="theme-color" media="(prefers-color-scheme: light)" content="{light_bg}"/>'
+        f'<meta name="theme-color" content="{dark_bg}" id="themeColorFallback"/>'
+        f"<script>{js}</script>"
+    )
 
 
 # =========================
 # HTML 渲染（data-i18n / data-i18n-html / data-i18n-attr）
 # =========================
+# locale 值里允许直接渲染的标量类型（元组提到模块级，免得每个节点都重建）
+_SCALAR_TYPES = (str, int, float, bool)
+
+@lru_cache(maxsize=None)
 def parse_i18n_attr_rules(raw: str) -> List[Tuple[str, str]]:
+    # 同一条 data-i18n-attr 规则串在所有语言里重复出现，解析一次即可
     if not raw:
         return []
-    parts = re.split(r"[;,]\s*", raw.strip())
+    # 分隔符只有 ; 和 ,（空白由下面的 strip 吃掉），纯字符串操作比正则快
+    parts = raw.strip().replace(";", ",").split(",")
     out: List[Tuple[str, str]] = []
     for p in parts:
+        p = p.strip()
         if not p or ":" not in p:
             continue
         a, k = p.split(":", 1)
@@ -282,118 +368,319 @@ def parse_i18n_attr_rules(raw: str) -> List[Tuple[str, str]]:
     return out
 
 
+# 无 i18n 标记的页面可以完全跳过 HTML 解析，只做字符串手术
+_HTML_TAG_RE = re.compile(r"<html\b[^>]*>", re.IGNORECASE)
+_HEAD_TAG_RE = re.compile(r"<head\b[^>]*>", re.IGNORECASE)
+_LANG_DIR_ATTR_RE = re.compile(r"""\s(?:lang|dir)\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)""", re.IGNORECASE)
+
+
+def _apply_i18n_fast(html_text: str, lang_spec: LangSpec) -> Optional[str]:
+    """页面没有任何 data-i18n 标记时的快速路径：不 parse，只改 <html> 属性 + 注入 head。
+
+    结构对不上（缺 <html>/<head>）返回 None，让调用方回退 DOM 路径。
+    """
+    m = _HTML_TAG_RE.search(html_text)
+    if not m:
+        return None
+
+    inner = _LANG_DIR_ATTR_RE.sub("", m.group(0)[5:-1])  # 去掉 "<html" 和 ">"，清掉旧 lang/dir
+    attrs = f' lang="{lang_spec.html_lang}"'
+    if lang_spec.rtl:
+        attrs += ' dir="rtl"'
+    out = html_text[: m.start()] + "<html" + attrs + inner + ">" + html_text[m.end():]
+
+    if INJECT_CRITICAL_HEAD and "i18n-critical-head" not in html_text:
+        hm = _HEAD_TAG_RE.search(out)
+        if not hm:
+            return None
+        out = out[: hm.end()] + critical_head_html(CRITICAL_DARK_BG, CRITICAL_LIGHT_BG) + out[hm.end():]
+
+    return out
+
+
 def apply_i18n_to_html(
         html_text: str,
         merged_locale: Dict[str, Any],
         lang_spec: LangSpec,
         vars_map: Dict[str, str],
-) -> str:
-    soup = BeautifulSoup(html_text, "html.parser")
+) -> bytes:
+    if "data-i18n" not in html_text:
+        fast = _apply_i18n_fast(html_text, lang_spec)
+        if fast is not None:
+            return fast.encode("utf-8")
+    if LexborHTMLParser is not None and not USE_BS4:
+        return _apply_i18n_selectolax(html_text, merged_locale, lang_spec, vars_map)
+    return _apply_i18n_bs4(html_text, merged_locale, lang_spec, vars_map)
 
-    if INJECT_CRITICAL_HEAD:
+
+def _apply_i18n_selectolax(
+        html_text: str,
+        merged_locale: Dict[str, Any],
+        lang_spec: LangSpec,
+        vars_map: Dict[str, str],
+) -> bytes:
+    tree = LexborHTMLParser(html_text)
+
+    # 标记直接在原始文本上查（比 DOM 查询便宜；源文件没有标记才需要注入）
+    if INJECT_CRITICAL_HEAD and "i18n-critical-head" not in html_text:
+        head = tree.css_first("head")
+        if head is not None:
+            # inner_html 赋值会按 HTML 解析，等价于把片段插到 head 最前面
+            head.inner_html = critical_head_html(CRITICAL_DARK_BG, CRITICAL_LIGHT_BG) + head.inner_html
+
+    html_tag = tree.css_first("html")
+    if html_tag is not None:
+        html_tag.attrs["lang"] = lang_spec.html_lang
+        if lang_spec.rtl:
+            html_tag.attrs["dir"] = "rtl"
+        elif "dir" in html_tag.attributes:
+            del html_tag.attrs["dir"]
+
+    # 语言内固定不变的查表/格式化绑定成局部名，内层循环零配置查找；
+    # flat dict 命中走一次 dict.get，miss 才退回带层级兜底的 locale_lookup
+    flat_get = merged_locale["__flat__"].get
+    fmt = format_vars
+
+    # 一次选择器遍历处理 data-i18n，并顺带记录另外两种标记是否存在；
+    # data-i18n-html 会整段替换子树（可能让已拿到的节点失效），存在时才按需重查
+    nodes = tree.css(I18N_SELECTOR)
+    has_html = False
+    has_attr = False
+    for el in nodes:
+        attrs = el.attributes
+        if "data-i18n-html" in attrs:
+            has_html = True
+        if "data-i18n-attr" in attrs:
+            has_attr = True
+
+        if "data-i18n" in attrs:
+            key = (attrs["data-i18n"] or "").strip()
+            if key:
+                val = flat_get(key)
+                if val is None:
+                    val = locale_lookup(merged_locale, key)
+                if isinstance(val, _SCALAR_TYPES):
+                    el.inner_html = html.escape(fmt(str(val), vars_map), quote=False)
+                del el.attrs["data-i18n"]
+
+    mutated = False
+    if has_html:
+        for el in tree.css("[data-i18n-html]"):
+            key = (el.attributes.get("data-i18n-html") or "").strip()
+            if not key:
+                continue
+            val = flat_get(key)
+            if val is None:
+                val = locale_lookup(merged_locale, key)
+            if isinstance(val, _SCALAR_TYPES):
+                el.inner_html = fmt(str(val), vars_map)
+                mutated = True
+            del el.attrs["data-i18n-html"]
+
+    if has_attr:
+        # 没有发生子树替换时复用第一遍的节点列表，免掉一次全树查询
+        attr_nodes = tree.css("[data-i18n-attr]") if mutated else nodes
+        for el in attr_nodes:
+            attrs = el.attributes
+            if "data-i18n-attr" not in attrs:
+                continue
+            rules = parse_i18n_attr_rules(attrs["data-i18n-attr"] or "")
+            for attr_name, key in rules:
+                val = flat_get(key)
+                if val is None:
+                    val = locale_lookup(merged_locale, key)
+                if isinstance(val, _SCALAR_TYPES):
+                    el.attrs[attr_name] = fmt(str(val), vars_map)
+            del el.attrs["data-i18n-attr"]
+
+    # ✅ 不重写资源路径；资源引用问题在开发阶段发现/约束
+    return tree.html.encode("utf-8")
+
+
+@lru_cache(maxsize=512)
+def _parse_fragment_cached(html_fragment: str) -> Tuple[Any, ...]:
+    # 同一段 data-i18n-html 片段（导航/页脚等）会在一个语言的多张页面里重复出现，
+    # 解析一次缓存模板节点；插入时 deepcopy，避免节点被多个树共享
+    frag = BeautifulSoup(html_fragment, BS4_PARSER)
+    root = frag.body if frag.body else frag
+    return tuple(root.contents)
+
+
+def _apply_i18n_bs4(
+        html_text: str,
+        merged_locale: Dict[str, Any],
+        lang_spec: LangSpec,
+        vars_map: Dict[str, str],
+) -> bytes:
+    soup = BeautifulSoup(html_text, BS4_PARSER)
+
+    if INJECT_CRITICAL_HEAD and "i18n-critical-head" not in html_text:
         ensure_critical_head(soup, CRITICAL_DARK_BG, CRITICAL_LIGHT_BG)
 
-    html_tag = soup.find("html")
-    if html_tag:
-        html_tag["lang"] = lang_spec.html_lang
+    # soup.html 是 O(1) 的根节点访问，不用 find() 再走一遍树；
+    # 直接操作 attrs dict 也绕开 __setitem__/__delitem__ 的封装
+    html_tag = soup.html
+    if html_tag is not None:
+        attrs = html_tag.attrs
+        attrs["lang"] = lang_spec.html_lang
         if lang_spec.rtl:
-            html_tag["dir"] = "rtl"
+            attrs["dir"] = "rtl"
         else:
-            html_tag.attrs.pop("dir", None)
-
-    for el in soup.select("[data-i18n]"):
-        key = (el.get("data-i18n") or "").strip()
-        if not key:
-            continue
-        val = locale_lookup(merged_locale, key)
-        if isinstance(val, (str, int, float, bool)):
-            el.clear()
-            el.append(format_vars(str(val), vars_map))
-        el.attrs.pop("data-i18n", None)
-
-    for el in soup.select("[data-i18n-html]"):
-        key = (el.get("data-i18n-html") or "").strip()
-        if not key:
-            continue
-        val = locale_lookup(merged_locale, key)
-        if isinstance(val, (str, int, float, bool)):
-            html_fragment = format_vars(str(val), vars_map)
-            el.clear()
-            frag = BeautifulSoup(html_fragment, "html.parser")
-            if frag.body:
-                for child in list(frag.body.contents):
-                    el.append(child)
-            else:
-                for child in list(frag.contents):
-                    el.append(child)
-        el.attrs.pop("data-i18n-html", None)
-
-    for el in soup.select("[data-i18n-attr]"):
-        rules = parse_i18n_attr_rules(el.get("data-i18n-attr", ""))
-        for attr_name, key in rules:
-            val = locale_lookup(merged_locale, key)
-            if isinstance(val, (str, int, float, bool)):
-                el[attr_name] = format_vars(str(val), vars_map)
-        el.attrs.pop("data-i18n-attr", None)
+            attrs.pop("dir", None)
+
+    # 语言内固定不变的查表/格式化绑定成局部名（同 selectolax 路径）
+    flat_get = merged_locale["__flat__"].get
+    fmt = format_vars
+
+    # find_all(True) 原生遍历一遍，绕开 soupsieve 的 CSS 引擎（原来是 3 次全树 select）
+    nodes = [el for el in soup.find_all(True) if "data-i18n" in el.attrs
+             or "data-i18n-html" in el.attrs or "data-i18n-attr" in el.attrs]
+
+    has_html = False
+    has_attr = False
+    for el in nodes:
+        a = el.attrs
+        if "data-i18n-html" in a:
+            has_html = True
+        if "data-i18n-attr" in a:
+            has_attr = True
+
+        if "data-i18n" in a:
+            key = (a["data-i18n"] or "").strip()
+            if key:
+                val = flat_get(key)
+                if val is None:
+                    val = locale_lookup(merged_locale, key)
+                if isinstance(val, _SCALAR_TYPES):
+                    el.clear()
+                    el.append(fmt(str(val), vars_map))
+                a.pop("data-i18n", None)
+
+    mutated = False
+    if has_html:
+        for el in nodes:
+            a = el.attrs
+            if "data-i18n-html" not in a:
+                continue
+            key = (a["data-i18n-html"] or "").strip()
+            if not key:
+                continue
+            val = flat_get(key)
+            if val is None:
+                val = locale_lookup(merged_locale, key)
+            if isinstance(val, _SCALAR_TYPES):
+                html_fragment = fmt(str(val), vars_map)
+                el.clear()
+                for child in _parse_fragment_cached(html_fragment):
+                    el.append(copy.deepcopy(child))
+                mutated = True
+            a.pop("data-i18n-html", None)
+
+    if has_attr:
+        # 片段替换可能带进新的 data-i18n-attr 节点，此时重查一次；否则复用列表
+        attr_nodes = soup.find_all(attrs={"data-i18n-attr": True}) if mutated else nodes
+        for el in attr_nodes:
+            a = el.attrs
+            if "data-i18n-attr" not in a:
+                continue
+            rules = parse_i18n_attr_rules(a.get("data-i18n-attr", ""))
+            for attr_name, key in rules:
+                val = flat_get(key)
+                if val is None:
+                    val = locale_lookup(merged_locale, key)
+                if isinstance(val, _SCALAR_TYPES):
+                    el[attr_name] = fmt(str(val), vars_map)
+            a.pop("data-i18n-attr", None)
 
     # ✅ 不重写资源路径；资源引用问题在开发阶段发现/约束
-    return str(soup)
+    # encode 一步出 utf-8 bytes，免去 str(soup) 再 write_text 的二次编码
+    return soup.encode("utf-8")
 
 
 # =========================
 # 文件遍历 & 拷贝
 # =========================
-def iter_html_files(src_root: Path) -> List[Path]:
-    """收集 src 下所有 html（排除 locales/）"""
-    out: List[Path] = []
-    for p in src_root.rglob("*.html"):
-        rel = p.relative_to(src_root)
-        if rel.parts and rel.parts[0] == "locales":
-            continue
-        out.append(p)
-    return out
+# 整个子树都不进 docs 的目录，os.walk 时原地剪枝、根本不下去
+EXCLUDE_DIRS = {"locales", ".git", "__pycache__", "node_modules"}
 
 
-def iter_static_files(src_root: Path) -> List[Path]:
-    """
-    复制到 docs/<lang>/ 或 docs/（base root）的静态文件：
-    - src 下所有非 html 文件
-    - 排除 locales/
-    - 排除 CNAME（只在根目录单独复制）
+def iter_src_files(src_root: Path) -> Tuple[List[Path], List[Path]]:
+    """一次 os.walk 同时收集待渲染 html 和静态文件。
+
+    静态文件 = 非 html，且排除 CNAME（只在根目录单独复制）；
+    locales/ 等目录在遍历时剪枝，不逐文件过滤。
     """
-    out: List[Path] = []
-    for p in src_root.rglob("*"):
-        if not p.is_file():
-            continue
-        rel = p.relative_to(src_root)
-        if rel.parts and rel.parts[0] == "locales":
-            continue
-        if p.name in EXCLUDE_FILENAMES_IN_LANG_DIRS:
-            continue
-        if p.suffix.lower() == ".html":
-            continue
-        out.append(p)
-    return out
+    html_files: List[Path] = []
+    static_files: List[Path] = []
+    for dirpath, dirs, files in os.walk(src_root):
+        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
+        base = Path(dirpath)
+        for f in files:
+            if f.lower().endswith(".html"):
+                html_files.append(base / f)
+            elif f not in EXCLUDE_FILENAMES_IN_LANG_DIRS:
+                static_files.append(base / f)
+    return html_files, static_files
 
 
 def copy_files_to(out_root: Path, files: List[Path], src_root: Path) -> None:
-    for p in files:
+    def _copy(p: Path) -> None:
         rel = p.relative_to(src_root)
         dst = out_root / rel
+        try:
+            ss = p.stat()
+            ds = dst.stat()
+            # 同 inode（硬链接）或 size+mtime 一致 → 内容没变，跳过
+            if ss.st_ino == ds.st_ino or (
+                    ss.st_size == ds.st_size and int(ss.st_mtime) == int(ds.st_mtime)):
+                return
+        except OSError:
+            pass
         dst.parent.mkdir(parents=True, exist_ok=True)
+        if HARDLINK_ASSETS:
+            try:
+                if dst.exists():
+                    dst.unlink()
+                os.link(p, dst)
+                return
+            except OSError:
+                pass  # 跨文件系统等情况回退普通复制
         shutil.copy2(p, dst)
 
+    if IO_WORKERS > 1 and len(files) > 4:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=IO_WORKERS) as ex:
+            list(ex.map(_copy, files))
+    else:
+        for p in files:
+            _copy(p)
+
 
 def ensure_clean_docs() -> None:
-    # 每次重建：清空 docs（避免旧文件残留）
-    if DOCS_DIR.exists():
+    # 每次重建：清空 docs（避免旧文件残留）；增量模式保留现有输出
+    if not INCREMENTAL and DOCS_DIR.exists():
         shutil.rmtree(DOCS_DIR)
     DOCS_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def write_file(path: Path, content: str) -> None:
+def write_file(path: Path, content: Union[str, bytes]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding="utf-8")
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    path.write_bytes(content)
+
+
+def write_files(pairs: List[Tuple[Path, bytes]]) -> None:
+    """批量落盘（渲染完成后统一写，线程重叠磁盘 IO）"""
+    if IO_WORKERS > 1 and len(pairs) > 4:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=IO_WORKERS) as ex:
+            list(ex.map(lambda pr: write_file(pr[0], pr[1]), pairs))
+    else:
+        for path, content in pairs:
+            write_file(path, content)
 
 
 def copy_cname_to_root() -> None:
@@ -414,6 +701,118 @@ def copy_cname_to_root() -> None:
 # - docs/ 根目录：额外输出一份完整的 base（zh-hans）站点（同样是“迁移+渲染”）
 # - docs/ 根目录：复制 CNAME
 # =========================
+def build_language(
+        lang: LangSpec,
+        html_files: List[Path],
+        html_texts: Dict[Path, str],
+        static_files: List[Path],
+        vars_map_base: Dict[str, str],
+        base_n: str,
+) -> List[str]:
+    """渲染单个语言目录（base 语言同时输出到 docs 根目录）。
+
+    语言之间完全独立（同一份 src，互不相交的输出目录），
+    因此可以放进 ProcessPoolExecutor 并行执行。
+    返回日志行，由父进程统一打印（避免并发输出交错）。
+    """
+    raw_code = (lang.code or "").strip()
+    code_n = norm_code(raw_code)
+    out_dir_name = code_n  # 输出目录统一小写
+
+    merged = load_locale_with_fallbacks(code_n, lang.fallbacks, base_n)
+    out_root = DOCS_DIR / out_dir_name
+
+    vars_map = dict(vars_map_base)
+    if code_n.startswith("en"):
+        vars_map["company"] = os.getenv("I18N_COMPANY_EN", vars_map["company"])
+
+    lines = [
+        f"=== build: {raw_code} -> {out_dir_name}  (html.lang={lang.html_lang}, rtl={lang.rtl})",
+        f" -> output [lang-dir]: {out_root}",
+    ]
+
+    # 1) 复制静态资源（含 assets/，按原结构）
+    if static_files:
+        copy_files_to(out_root, static_files, SRC_DIR)
+        lines.append(f"   ✅ copied {len(static_files)} static files (exclude: {sorted(EXCLUDE_FILENAMES_IN_LANG_DIRS)})")
+    else:
+        lines.append("   ℹ️ no static files to copy")
+
+    # base 语言额外在根目录输出一份完整站点：复用同一份渲染结果，不再二次 parse/渲染
+    base_at_root = BASE_ALSO_AT_ROOT and (code_n == base_n)
+
+    # 增量模式：源文本 + 压平 locale + 渲染配置的签名没变，连渲染都省掉
+    sig_old: Dict[str, str] = {}
+    sig_new: Dict[str, str] = {}
+    sig_file = RENDER_SIG_DIR / f"{out_dir_name}.json"
+    loc_sig = ""
+    if INCREMENTAL:
+        cfg = json.dumps(
+            [sorted(vars_map.items()), lang.html_lang, lang.rtl,
+             INJECT_CRITICAL_HEAD, CRITICAL_DARK_BG, CRITICAL_LIGHT_BG],
+            ensure_ascii=False,
+        )
+        loc_sig = hashlib.blake2b(
+            (json.dumps(merged["__flat__"], ensure_ascii=False, sort_keys=True) + cfg).encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+        if sig_file.exists():
+            try:
+                sig_old = json_loads_bytes(sig_file.read_bytes())
+            except Exception:
+                sig_old = {}
+
+    # 2) 渲染所有 html（按原结构；每个文件只 parse + 渲染一次，最后批量写盘）
+    pending: List[Tuple[Path, bytes]] = []
+    skipped = 0
+    for src_html in html_files:
+        rel = src_html.relative_to(SRC_DIR)
+        html_text = html_texts[src_html]
+
+        if INCREMENTAL:
+            sig = hashlib.blake2b(html_text.encode("utf-8"), digest_size=16).hexdigest() + "." + loc_sig
+            sig_new[str(rel)] = sig
+            if sig_old.get(str(rel)) == sig and (out_root / rel).exists() and (
+                    not base_at_root or (DOCS_DIR / rel).exists()):
+                skipped += 1
+                continue
+
+        rendered = apply_i18n_to_html(
+            html_text=html_text,
+            merged_locale=merged,
+            lang_spec=lang,
+            vars_map=vars_map,
+        )
+        pending.append((out_root / rel, rendered))
+        if base_at_root:
+            pending.append((DOCS_DIR / rel, rendered))
+    write_files(pending)
+
+    if INCREMENTAL:
+        sig_file.parent.mkdir(parents=True, exist_ok=True)
+        sig_file.write_text(json.dumps(sig_new, indent=2) + "\n", encoding="utf-8")
+
+    if skipped:
+        lines.append(f"   ✅ wrote {len(html_files) - skipped} html files (skipped {skipped} unchanged)")
+    else:
+        lines.append(f"   ✅ wrote {len(html_files)} html files")
+
+    # 3) ✅ 根目录也输出一份完整 base（zh-hans）
+    if base_at_root:
+        lines.append(f" -> output [root base]: {DOCS_DIR}")
+
+        # 3.1 复制静态资源到根目录（按原结构，含 assets/）
+        if static_files:
+            copy_files_to(DOCS_DIR, static_files, SRC_DIR)
+            lines.append(f"   ✅ [root] copied {len(static_files)} static files")
+        else:
+            lines.append("   ℹ️ [root] no static files to copy")
+
+        lines.append(f"   ✅ [root] wrote {len(html_files)} html files (base full site)")
+
+    return lines
+
+
 def build() -> None:
     if not LANGS_FILE.exists():
         raise SystemExit(f"找不到 languages.json: {LANGS_FILE}")
@@ -428,78 +827,31 @@ def build() -> None:
 
     ensure_clean_docs()
 
-    html_files = iter_html_files(SRC_DIR)
+    html_files, static_files = iter_src_files(SRC_DIR)
     if not html_files:
         raise SystemExit("src 下没有发现 html 文件")
 
-    static_files = iter_static_files(SRC_DIR)
+    # ✅ 每个源 html 只读一次，全语言共享同一份文本
+    html_texts = {p: p.read_text(encoding="utf-8") for p in html_files}
 
     vars_map_base = {"company": DEFAULT_COMPANY, "year": DEFAULT_YEAR}
     base_n = norm_code(BASE)
 
-    # 先输出每个语言目录
-    for lang in langs:
-        raw_code = (lang.code or "").strip()
-        code_n = norm_code(raw_code)
-        out_dir_name = code_n  # 输出目录统一小写
-
-        merged = load_locale_with_fallbacks(code_n, lang.fallbacks, base_n)
-        out_root = DOCS_DIR / out_dir_name
-
-        vars_map = dict(vars_map_base)
-        if code_n.startswith("en"):
-            vars_map["company"] = os.getenv("I18N_COMPANY_EN", vars_map["company"])
-
-        print(f"\n=== build: {raw_code} -> {out_dir_name}  (html.lang={lang.html_lang}, rtl={lang.rtl})")
-        print(f" -> output [lang-dir]: {out_root}")
-
-        # 1) 复制静态资源（含 assets/，按原结构）
-        if static_files:
-            copy_files_to(out_root, static_files, SRC_DIR)
-            print(f"   ✅ copied {len(static_files)} static files (exclude: {sorted(EXCLUDE_FILENAMES_IN_LANG_DIRS)})")
-        else:
-            print("   ℹ️ no static files to copy")
-
-        # 2) 渲染所有 html（按原结构）
-        for src_html in html_files:
-            rel = src_html.relative_to(SRC_DIR)
-            out_path = out_root / rel
-            html_text = src_html.read_text(encoding="utf-8")
-            rendered = apply_i18n_to_html(
-                html_text=html_text,
-                merged_locale=merged,
-                lang_spec=lang,
-                vars_map=vars_map,
-            )
-            write_file(out_path, rendered)
-
-        print(f"   ✅ wrote {len(html_files)} html files")
-
-        # 3) ✅ 根目录也输出一份完整 base（zh-hans）
-        if BASE_ALSO_AT_ROOT and (code_n == base_n):
-            print(f" -> output [root base]: {DOCS_DIR}")
-
-            # 3.1 复制静态资源到根目录（按原结构，含 assets/）
-            if static_files:
-                copy_files_to(DOCS_DIR, static_files, SRC_DIR)
-                print(f"   ✅ [root] copied {len(static_files)} static files")
-            else:
-                print("   ℹ️ [root] no static files to copy")
-
-            # 3.2 渲染所有 html 到根目录（按原结构）
-            for src_html in html_files:
-                rel = src_html.relative_to(SRC_DIR)
-                out_path = DOCS_DIR / rel
-                html_text = src_html.read_text(encoding="utf-8")
-                rendered = apply_i18n_to_html(
-                    html_text=html_text,
-                    merged_locale=merged,
-                    lang_spec=lang,
-                    vars_map=vars_map,
-                )
-                write_file(out_path, rendered)
-
-            print(f"   ✅ [root] wrote {len(html_files)} html files (base full site)")
+    # 先输出每个语言目录（语言之间无共享状态，可按进程并行）
+    workers = min(BUILD_WORKERS, len(langs))
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futures = [
+                ex.submit(build_language, lang, html_files, html_texts, static_files, vars_map_base, base_n)
+                for lang in langs
+            ]
+            for fut in as_completed(futures):
+                print("\n" + "\n".join(fut.result()))
+    else:
+        for lang in langs:
+            print("\n" + "\n".join(build_language(lang, html_files, html_texts, static_files, vars_map_base, base_n)))
 
     # 根目录复制 CNAME（只在根目录）
     copy_cname_to_root()
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import re
 import time
 import random
+import shutil
 import threading
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, List, Tuple, Optional, Union, Callable
 
@@ -15,6 +18,36 @@ try:
 except Exception:
     OpenAI = None
 
+# ✅ orjson（C 实现，可选）：直接吃 bytes，省掉 read_text 的一次 UTF-8 解码；
+#    翻译缓存能涨到几十 MB，冷启动收益明显。没装则回退 stdlib json
+try:
+    import orjson  # pip install orjson
+except Exception:
+    orjson = None
+
+# ✅ tiktoken（可选）：分批/限速时用真实 tokenizer 估 token 数；
+#    没装就退回 ~3 字符/token 的粗估，行为不变只是估得糙一点
+try:
+    import tiktoken  # pip install tiktoken
+except Exception:
+    tiktoken = None
+
+
+def read_json_file(path: Path) -> Any:
+    data = path.read_bytes()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+@lru_cache(maxsize=256)
+def _read_json_mtime(path_str: str, mtime_ns: int) -> Any:
+    return read_json_file(Path(path_str))
+
+
+def read_json_file_cached(path: Path) -> Any:
+    """按 (路径, mtime) 缓存的读取：同一个文件被多个语言当 fallback 反复读时只解析一次。
+    返回对象当只读用，勿原地修改。文件被改写后 mtime 变化自动失效。"""
+    return _read_json_mtime(str(path), path.stat().st_mtime_ns)
+
 
 # =========================
 # 固定配置（从项目根目录执行：python3 scripts/i18n_tool.py）
@@ -32,6 +65,25 @@ MODEL = "gpt-4o-mini"
 # 可通过环境变量控制：I18N_WORKERS=6 python3 scripts/i18n_tool.py
 MAX_WORKERS = int(os.getenv("I18N_WORKERS", "6"))
 
+# ✅ 单次请求合并的条数（1 = 逐条请求）：把网络往返和系统提示词开销摊到 N 条上
+# I18N_BATCH_SIZE=10 python3 scripts/i18n_tool.py
+BATCH_SIZE = max(1, int(os.getenv("I18N_BATCH_SIZE", "20")))
+
+# ✅ 单批输入 token 预算（0 = 关闭，退回纯按条数分批）：长短文案混排时
+#    按预估 token 贪心装箱，每批大小更均匀，不会一批全是长文案
+# I18N_BATCH_TOKENS=4000 python3 scripts/i18n_tool.py
+BATCH_TOKENS = max(0, int(os.getenv("I18N_BATCH_TOKENS", "6000")))
+
+# ✅ I18N_ASYNC=1：并发改走 AsyncOpenAI + asyncio（单事件循环，退避不占线程）
+#    默认仍是线程池；两种模式下日志/写文件行为一致
+ASYNC_MODE = os.getenv("I18N_ASYNC", "0") == "1"
+
+# ✅ 客户端限速（0 = 关闭）：发请求前先取令牌，平滑到达率，
+#    避免大批量 force_full 一头撞上 429 再靠指数退避干等
+# I18N_RPM=500 I18N_TPM=200000 python3 scripts/i18n_tool.py
+I18N_RPM = int(os.getenv("I18N_RPM", "0"))
+I18N_TPM = int(os.getenv("I18N_TPM", "0"))
+
 CACHE_FILE = Path(".cache/i18n_translate_cache.json")
 APIKEY_FILE = Path("scripts/apikey")
 
@@ -73,6 +125,10 @@ def placeholders_equal(src: str, tgt: str) -> bool:
     return extract_placeholders(src) == extract_placeholders(tgt)
 
 def mask_placeholders(text: str) -> Tuple[str, Dict[str, str]]:
+    # 大多数文案没有占位符：先 search 一次，省掉 sub 扫描和 mapping 构建
+    if not text or not _PLACEHOLDER_RE.search(text):
+        return text, {}
+
     mapping: Dict[str, str] = {}
     idx = 0
 
@@ -85,10 +141,13 @@ def mask_placeholders(text: str) -> Tuple[str, Dict[str, str]]:
 
     return _PLACEHOLDER_RE.sub(repl, text), mapping
 
+_PH_TOKEN_RE = re.compile(r"__PH\d+__")
+
 def unmask_placeholders(text: str, mapping: Dict[str, str]) -> str:
-    for k, v in mapping.items():
-        text = text.replace(k, v)
-    return text
+    # 所有 token 共享 __PH 前缀：一次 sub 查表还原，不用逐 key 全文 replace
+    if not mapping:
+        return text
+    return _PH_TOKEN_RE.sub(lambda m: mapping.get(m.group(0), m.group(0)), text)
 
 
 # =========================
@@ -105,7 +164,7 @@ def load_protected_terms() -> List[str]:
 
     if PROTECTED_TERMS_FILE.exists():
         try:
-            data = json.loads(PROTECTED_TERMS_FILE.read_text(encoding="utf-8"))
+            data = read_json_file(PROTECTED_TERMS_FILE)
             if isinstance(data, list):
                 terms.extend([str(x) for x in data if str(x).strip()])
         except Exception:
@@ -121,6 +180,13 @@ def load_protected_terms() -> List[str]:
     uniq.sort(key=len, reverse=True)
     return uniq
 
+@lru_cache(maxsize=8)
+def _terms_pattern(terms: Tuple[str, ...]) -> "re.Pattern[str]":
+    # 所有保护词合成一个交替正则，一次线性扫描替换全部命中；
+    # 词表已长度降序，交替分支同序 = 保留“长词优先”语义
+    return re.compile("|".join(re.escape(t) for t in terms))
+
+
 def mask_protected_terms(text: str, terms: List[str]) -> Tuple[str, Dict[str, str]]:
     """
     把 text 里出现的保护词替换成 __TERM0__/__TERM1__...，避免被模型翻译
@@ -129,24 +195,24 @@ def mask_protected_terms(text: str, terms: List[str]) -> Tuple[str, Dict[str, st
         return text, {}
 
     mapping: Dict[str, str] = {}
-    out = text
-    idx = 0
-    for term in terms:
-        if not term:
-            continue
-        if term in out:
-            token = f"__TERM{idx}__"
+    token_of: Dict[str, str] = {}
+
+    def repl(m: "re.Match[str]") -> str:
+        term = m.group(0)
+        token = token_of.get(term)
+        if token is None:
+            token = f"__TERM{len(token_of)}__"
+            token_of[term] = token
             mapping[token] = term
-            out = out.replace(term, token)
-            idx += 1
+        return token
+
+    out = _terms_pattern(tuple(t for t in terms if t)).sub(repl, text)
     return out, mapping
 
 def unmask_protected_terms(text: str, mapping: Dict[str, str]) -> str:
     if not text or not mapping:
         return text
-    for k, v in mapping.items():
-        text = text.replace(k, v)
-    return text
+    return _TERM_TOKEN_RE.sub(lambda m: mapping.get(m.group(0), m.group(0)), text)
 
 
 # =========================
@@ -188,6 +254,11 @@ def path_sort_key(path: str) -> Tuple:
 # 注意：如果源文件本来就是平铺 key（含 . 或 []），这里不会拆 key
 # =========================
 def flatten_json(obj: Any, prefix: str = "") -> List[Tuple[str, Any]]:
+    # ✅ 本工具写出的 locale 本来就是平铺 dict：值全是标量时直接拿 items，免递归
+    if not prefix and isinstance(obj, dict) and all(
+            not isinstance(v, (dict, list)) for v in obj.values()):
+        return list(obj.items())
+
     out: List[Tuple[str, Any]] = []
     if isinstance(obj, dict):
         for k, v in obj.items():  # insertion-order
@@ -201,20 +272,42 @@ def flatten_json(obj: Any, prefix: str = "") -> List[Tuple[str, Any]]:
         out.append((prefix, obj))
     return out
 
+def flatten_json_into(out: Dict[str, Any], obj: Any, prefix: str = "") -> None:
+    """flatten_json 的 dict 版：直接写进保序 dict，省掉中间 tuple 列表"""
+    if not prefix and isinstance(obj, dict) and all(
+            not isinstance(v, (dict, list)) for v in obj.values()):
+        out.update(obj)
+        return
+    if isinstance(obj, dict):
+        for k, v in obj.items():  # insertion-order
+            flatten_json_into(out, v, f"{prefix}.{k}" if prefix else str(k))
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            flatten_json_into(out, v, f"{prefix}[{i}]")
+    else:
+        out[prefix] = obj
+
 def pairs_to_flat_dict(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
     d: Dict[str, Any] = {}
     for k, v in pairs:
         d[k] = v
     return d
 
+def dumps_pretty(obj: Any) -> bytes:
+    # ✅ orjson 的 OPT_INDENT_2 输出与 stdlib ensure_ascii=False, indent=2 逐字节一致
+    #    （已核对本仓库全部 locale），dumps 快一个量级；没装 orjson 走原样回退
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+
 def write_json_preserve_order(path: Path, obj: Any) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    path.write_bytes(dumps_pretty(obj))
 
 def atomic_write_json(path: Path, obj: Any) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    tmp.write_bytes(dumps_pretty(obj))
     tmp.replace(path)
 
 
@@ -239,7 +332,7 @@ class LangSpec:
     rtl: bool
 
 def load_languages() -> List[LangSpec]:
-    data = json.loads(LANGS_FILE.read_text(encoding="utf-8"))
+    data = read_json_file_cached(LANGS_FILE)
     out: List[LangSpec] = []
     for x in data:
         out.append(
@@ -277,20 +370,36 @@ def read_api_key() -> str:
 # =========================
 # 缓存
 # =========================
+def cache_key(src_lang: str, tgt_lang: str, text: str) -> str:
+    # ✅ key 里只存原文的 BLAKE2b 摘要（#前缀区分旧格式），长文案不再整段进 key：
+    #    缓存文件小一圈，load/dump 和 dict 查找都便宜
+    h = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{src_lang}|||{tgt_lang}|||#{h}"
+
+
+def _migrate_cache_keys(raw: Dict[str, str]) -> Dict[str, str]:
+    """把旧格式（key 里带原文全文）的条目换算成哈希 key，一次性迁移"""
+    out: Dict[str, str] = {}
+    for k, v in raw.items():
+        parts = k.split("|||", 2)
+        if len(parts) == 3 and not parts[2].startswith("#"):
+            out[cache_key(parts[0], parts[1], parts[2])] = v
+        else:
+            out[k] = v
+    return out
+
+
 def load_cache() -> Dict[str, str]:
     if not CACHE_FILE.exists():
         return {}
     try:
-        return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
+        return _migrate_cache_keys(read_json_file(CACHE_FILE))
     except Exception:
         return {}
 
 def save_cache(cache: Dict[str, str]) -> None:
     CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    CACHE_FILE.write_text(json.dumps(cache, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
-
-def cache_key(src_lang: str, tgt_lang: str, text: str) -> str:
-    return f"{src_lang}|||{tgt_lang}|||{text}"
+    CACHE_FILE.write_bytes(dumps_pretty(cache))
 
 
 # =========================
@@ -330,6 +439,130 @@ def build_system_prompt(src_lang_name: str, tgt_lang_name: str, tgt_code: str) -
         rules.append("IMPORTANT: Do NOT use any Chinese characters in the output.")
     return " ".join(rules)
 
+# =========================
+# 客户端限速（令牌桶）
+# =========================
+class RateLimiter:
+    """RPM/TPM 双令牌桶：按 monotonic 增量补桶，线程安全；两桶都为 0 时等于不限速"""
+
+    def __init__(self, rpm: int, tpm: int) -> None:
+        self.rpm = max(0, rpm)
+        self.tpm = max(0, tpm)
+        self._req = float(self.rpm)
+        self._tok = float(self.tpm)
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        dt = now - self._last
+        self._last = now
+        if self.rpm:
+            self._req = min(float(self.rpm), self._req + dt * self.rpm / 60.0)
+        if self.tpm:
+            self._tok = min(float(self.tpm), self._tok + dt * self.tpm / 60.0)
+
+    def acquire(self, requests: int = 1, tokens: int = 0) -> None:
+        if not self.rpm and not self.tpm:
+            return
+        # ✅ 超过桶容量的请求按容量封顶：桶最多补到 rpm/tpm（见 _refill 的 min），
+        #    不封顶的话 TPM 设得比一批的估算还小就会在 wait 循环里永远挂死
+        if self.rpm:
+            requests = min(requests, self.rpm)
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        with self._cond:
+            while True:
+                self._refill()
+                if (not self.rpm or self._req >= requests) and (
+                        not self.tpm or self._tok >= tokens):
+                    if self.rpm:
+                        self._req -= requests
+                    if self.tpm:
+                        self._tok -= tokens
+                    return
+                self._cond.wait(timeout=0.05)
+
+
+_RATE_LIMITER = RateLimiter(I18N_RPM, I18N_TPM)
+
+
+_tiktoken_enc = None
+
+
+def estimate_text_tokens(text: str) -> int:
+    """估单条文案的输入 token 数：装了 tiktoken 就用真实 tokenizer（按 MODEL 选表），
+    否则 ~3 字符/token 粗估。只用于分批和限速，不用精确。"""
+    global _tiktoken_enc
+    if tiktoken is not None:
+        if _tiktoken_enc is None:
+            try:
+                _tiktoken_enc = tiktoken.encoding_for_model(MODEL)
+            except Exception:
+                _tiktoken_enc = tiktoken.get_encoding("cl100k_base")
+        return len(_tiktoken_enc.encode(text))
+    return len(text) // 3
+
+
+def estimate_batch_tokens(batch: List[Tuple[str, str]]) -> int:
+    # 输入估算 + 每条 256 输出余量
+    return sum(estimate_text_tokens(t) for _, t in batch) + 256 * max(1, len(batch))
+
+
+# ✅ 全局共享一个 client：openai>=1.x 的 client 线程安全，内部 httpx 连接池
+#    会在 worker 间复用 keep-alive 连接，省掉每线程首次调用的 TCP+TLS 握手
+_client_lock = threading.Lock()
+_shared_client: Optional["OpenAI"] = None
+
+
+def get_shared_client(api_key: str) -> "OpenAI":
+    global _shared_client
+    with _client_lock:
+        if _shared_client is None:
+            try:
+                import httpx  # openai 的传输层依赖，正常都有
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_keepalive_connections=MAX_WORKERS * 2,
+                        max_connections=MAX_WORKERS * 4,
+                        keepalive_expiry=60.0,
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                )
+                _shared_client = OpenAI(api_key=api_key, http_client=http_client)
+            except Exception:
+                _shared_client = OpenAI(api_key=api_key)
+        return _shared_client
+
+
+def _batch_messages(
+        src_lang_name: str,
+        tgt_lang_name: str,
+        tgt_code: str,
+        batch: List[Tuple[str, str]],
+) -> List[Dict[str, str]]:
+    payload = {"items": [{"path": p, "text": t} for p, t in batch]}
+    return [
+        {"role": "system", "content": build_system_prompt(src_lang_name, tgt_lang_name, tgt_code)},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+    ]
+
+
+def _parse_batch_response(out: str, batch_len: int) -> Dict[str, str]:
+    data = json.loads(out)
+    items = data.get("items") or []
+    result: Dict[str, str] = {}
+    for it in items:
+        p = it.get("path")
+        txt = it.get("text")
+        if isinstance(p, str) and isinstance(txt, str):
+            result[p] = txt.strip()
+
+    if len(result) >= max(1, int(0.85 * batch_len)):
+        return result
+    raise ValueError("Batch parse ok but too few items returned.")
+
+
 def call_openai_batch(
         client: OpenAI,
         model: str,
@@ -340,40 +573,60 @@ def call_openai_batch(
         timeout: float = 60.0,
         max_retries: int = 4,
 ) -> Dict[str, str]:
-    payload = {"items": [{"path": p, "text": t} for p, t in batch]}
-    sys_prompt = build_system_prompt(src_lang_name, tgt_lang_name, tgt_code)
+    messages = _batch_messages(src_lang_name, tgt_lang_name, tgt_code, batch)
 
     last_err: Optional[Exception] = None
     for attempt in range(max_retries):
         try:
             resp = client.chat.completions.create(
                 model=model,
-                messages=[
-                    {"role": "system", "content": sys_prompt},
-                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-                ],
+                messages=messages,
                 temperature=0.2 if attempt == 0 else 0.0,
                 top_p=0.9,
                 timeout=timeout,
             )
             out = (resp.choices[0].message.content or "").strip()
-            data = json.loads(out)
+            return _parse_batch_response(out, len(batch))
+        except Exception as e:
+            last_err = e
+            # ✅ 退避封顶 8s，且最后一次失败不再白睡一轮（原来最多多等 8s 才抛错）
+            if attempt + 1 < max_retries:
+                time.sleep(min(2.0 ** attempt, 8.0) + random.uniform(0, 0.25))
 
-            items = data.get("items") or []
-            result: Dict[str, str] = {}
-            for it in items:
-                p = it.get("path")
-                txt = it.get("text")
-                if isinstance(p, str) and isinstance(txt, str):
-                    result[p] = txt.strip()
+    raise RuntimeError(f"Batch translate failed: {last_err}")
 
-            if len(result) >= max(1, int(0.85 * len(batch))):
-                return result
 
-            raise ValueError("Batch parse ok but too few items returned.")
+async def call_openai_batch_async(
+        client: Any,  # openai.AsyncOpenAI
+        model: str,
+        src_lang_name: str,
+        tgt_lang_name: str,
+        tgt_code: str,
+        batch: List[Tuple[str, str]],
+        timeout: float = 60.0,
+        max_retries: int = 4,
+) -> Dict[str, str]:
+    """call_openai_batch 的 async 版：退避用 asyncio.sleep，不占工作线程"""
+    import asyncio
+
+    messages = _batch_messages(src_lang_name, tgt_lang_name, tgt_code, batch)
+
+    last_err: Optional[Exception] = None
+    for attempt in range(max_retries):
+        try:
+            resp = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.2 if attempt == 0 else 0.0,
+                top_p=0.9,
+                timeout=timeout,
+            )
+            out = (resp.choices[0].message.content or "").strip()
+            return _parse_batch_response(out, len(batch))
         except Exception as e:
             last_err = e
-            time.sleep((2 ** attempt) + random.uniform(0, 0.25))
+            if attempt + 1 < max_retries:
+                await asyncio.sleep(min(2.0 ** attempt, 8.0) + random.uniform(0, 0.25))
 
     raise RuntimeError(f"Batch translate failed: {last_err}")
 
@@ -387,6 +640,29 @@ def default_log_translation(tgt_code: str, path: str, src_text: str, tgt_text: s
     print(f"  TGT: {tgt_text}\n", flush=True)
 
 
+def _replay_patch_journal(out_path: Path, existing_obj: Any) -> Any:
+    """上次运行中断时残留的补丁日志：把已完成的条目合回 existing，避免重翻"""
+    pj = out_path.with_suffix(".patches.jsonl")
+    if not pj.exists():
+        return existing_obj
+    patched: Dict[str, Any] = dict(existing_obj) if isinstance(existing_obj, dict) else {}
+    try:
+        with pj.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    patch = json.loads(line)
+                except Exception:
+                    continue  # 崩溃可能留下半行，跳过
+                if isinstance(patch, dict):
+                    patched.update(patch)
+    except Exception:
+        return existing_obj
+    return patched if patched else existing_obj
+
+
 def translate_tree(
         *,
         base_obj: Any,
@@ -436,51 +712,37 @@ def translate_tree(
         raise SystemExit("OpenAI SDK 未安装：pip install openai>=1.0.0")
 
     base_pairs = flatten_json(base_obj)
-    base_map: Dict[str, Any] = {p: v for p, v in base_pairs}
 
-    existing_pairs = flatten_json(existing_obj) if existing_obj is not None else []
-    existing_map: Dict[str, Any] = {p: v for p, v in existing_pairs}
+    # ✅ 有残留补丁日志说明上次没走到终稿：先回放，已翻好的不再进 todo
+    if out_path is not None:
+        existing_obj = _replay_patch_journal(out_path, existing_obj)
+
+    # force_full 根本不看 existing，连压平都省了
+    existing_map: Dict[str, Any] = {}
+    if not force_full and existing_obj is not None:
+        flatten_json_into(existing_map, existing_obj)
 
     # =========================
-    # ✅ 先搭出最终 out_dict（确保写出的 key 顺序稳定）
+    # ✅ 一次遍历同时搭 base_map / out_dict / todo（原来要扫 base_pairs 四遍）
     # =========================
+    base_map: Dict[str, Any] = {}
     out_dict: Dict[str, Any] = {}
 
-    if force_full:
-        for path, val in base_pairs:
-            if isinstance(val, str):
-                out_dict[path] = ""
-            else:
-                out_dict[path] = val
-    else:
-        # 先保留 existing 的顺序
-        for p, v in existing_pairs:
-            out_dict[p] = v
-
-        # 再补 base 中缺失的非字符串项
-        for path, val in base_pairs:
-            if path in out_dict:
-                continue
-            if not isinstance(val, str):
-                out_dict[path] = val
-
-        # 再补 base 中缺失的字符串项占位（保证后续覆盖不改变顺序）
-        for path, val in base_pairs:
-            if path in out_dict:
-                continue
-            if isinstance(val, str):
-                out_dict[path] = ""
+    if not force_full:
+        # 先保留 existing 的顺序；base 新增的 key 按 base 顺序追加在后面
+        out_dict.update(existing_map)
 
-    # =========================
-    # todo + 映射（占位符/保护词）
-    # =========================
     todo: List[Tuple[int, str, str]] = []  # (seq, path, masked_src)
     masked_maps: Dict[str, Dict[str, str]] = {}
     term_maps: Dict[str, Dict[str, str]] = {}
 
     seq = 0
     for path, val in base_pairs:
+        base_map[path] = val
+
         if not isinstance(val, str):
+            if force_full or path not in out_dict:
+                out_dict[path] = val
             continue
 
         # 增量：已有非空译文就跳过
@@ -489,6 +751,10 @@ def translate_tree(
             if isinstance(cur, str) and cur.strip() != "":
                 continue
 
+        # 先占位（保证后续覆盖不改变 key 顺序）
+        if force_full or path not in out_dict:
+            out_dict[path] = ""
+
         # ✅ 例外：整句命中保护词 -> 直接 copy，不走翻译
         if val.strip() in protected_terms:
             out_dict[path] = val
@@ -516,15 +782,38 @@ def translate_tree(
     if out_path:
         atomic_write_json(out_path, out_dict)
 
+    # ✅ 分批：条数以 BATCH_SIZE 封顶，再叠一层 token 预算（BATCH_TOKENS）——
+    #    按原顺序贪心装箱，一批装满（条数或 token 任一到顶）就开新批。
+    #    保持原顺序是有意的：进度日志和骨架文件的更新顺序跟 key 顺序一致
+    if BATCH_TOKENS:
+        batches = []
+        cur: List[Tuple[int, str, str]] = []
+        cur_tokens = 0
+        for item in todo:
+            t = estimate_text_tokens(item[2]) + 256  # 输入 + 输出余量
+            if cur and (len(cur) >= BATCH_SIZE or cur_tokens + t > BATCH_TOKENS):
+                batches.append(cur)
+                cur, cur_tokens = [], 0
+            cur.append(item)
+            cur_tokens += t
+        if cur:
+            batches.append(cur)
+    else:
+        batches = [todo[i:i + BATCH_SIZE] for i in range(0, len(todo), BATCH_SIZE)]
+
     total = len(todo)
     mode = "并发" if MAX_WORKERS > 1 else "单线程"
     if total > 0:
-        print(f"🧩 [{tgt_code}] 待翻译 {total} 条（{mode}，每条完成即日志 + 写文件）", flush=True)
+        print(f"🧩 [{tgt_code}] 待翻译 {total} 条 / {len(batches)} 批（{mode}，每条完成即日志 + 写文件）", flush=True)
 
     lock = threading.Lock()
     completed = 0
     succeeded = 0
 
+    # ✅ 目标语言是否 CJK 在整轮翻译里不变：判一次存 flag，
+    #    不用每条译文都走一遍 is_cjk 的前缀匹配
+    strip_cjk = not is_cjk(tgt_code)
+
     def postprocess(path: str, masked_tgt: str) -> Optional[str]:
         src_text = base_map.get(path)
         if not isinstance(src_text, str):
@@ -534,14 +823,17 @@ def translate_tree(
         unmasked = unmask_placeholders(masked_tgt, masked_maps.get(path, {}))
 
         # ✅ 关键：先做“非CJK去中文”，此时保护词还是 __TERM#__ token，不会被删
-        unmasked = ensure_no_cjk_when_forbidden(unmasked, tgt_code)
+        if strip_cjk and unmasked:
+            unmasked = _CJK_RE.sub("", unmasked).strip()
 
         # ✅ 然后再还原保护词（即使是中文，也会保留下来）
         unmasked = unmask_protected_terms(unmasked, term_maps.get(path, {}))
 
         # 占位符一致性修复（保持你原逻辑）
-        if extract_placeholders(src_text) and not placeholders_equal(src_text, unmasked):
-            src_ph = extract_placeholders(src_text)
+        # ✅ 掩码映射在 todo 构建时就按出现顺序存了原文占位符，不再扫两遍原文；
+        #    无占位符的条目（大多数）整块短路
+        src_ph = list(masked_maps.get(path, {}).values())
+        if src_ph and extract_placeholders(unmasked) != src_ph:
             it = iter(src_ph)
             def repl(m: re.Match) -> str:
                 return next(it, m.group(0))
@@ -549,29 +841,69 @@ def translate_tree(
 
         return unmasked
 
-    # 每线程复用一个 client
-    _tl = threading.local()
-
-    def get_client() -> OpenAI:
-        c = getattr(_tl, "client", None)
-        if c is None:
-            _tl.client = OpenAI(api_key=api_key)
-            c = _tl.client
-        return c
+    # 所有 worker 共用一个 client（线程安全，连接池复用 keep-alive）
+    client = get_shared_client(api_key)
 
-    def translate_one(path: str, masked_src: str) -> Optional[str]:
-        client = get_client()
+    def translate_batch(items: List[Tuple[int, str, str]]) -> List[Tuple[int, str, Optional[str]]]:
+        batch = [(path, masked_src) for _, path, masked_src in items]
+        _RATE_LIMITER.acquire(1, estimate_batch_tokens(batch))
         out_map = call_openai_batch(
             client=client,
             model=model,
             src_lang_name=src_lang_name,
             tgt_lang_name=tgt_lang_name,
             tgt_code=tgt_code,
-            batch=[(path, masked_src)],  # ✅ 永远单条
+            batch=batch,
         )
-        if path not in out_map:
-            return None
-        return postprocess(path, out_map[path])
+        # ✅ 响应里漏答的 id（85% 门槛下最多缺 15%）先单独补问一小批，
+        #    补问也失败才标失败，增量重跑只兜底真正两轮都没答上的条目
+        missing = [(p, s) for p, s in batch if p not in out_map]
+        if missing:
+            try:
+                _RATE_LIMITER.acquire(1, estimate_batch_tokens(missing))
+                out_map.update(call_openai_batch(
+                    client=client,
+                    model=model,
+                    src_lang_name=src_lang_name,
+                    tgt_lang_name=tgt_lang_name,
+                    tgt_code=tgt_code,
+                    batch=missing,
+                ))
+            except Exception:
+                pass
+        results: List[Tuple[int, str, Optional[str]]] = []
+        for seq_no, path, _ in items:
+            masked_tgt = out_map.get(path)
+            final = postprocess(path, masked_tgt) if isinstance(masked_tgt, str) else None
+            results.append((seq_no, path, final))
+        return results
+
+    # ✅ 写盘合并：成功只标脏，后台线程按固定节拍把快照落盘。
+    #    原来每条成功都整文件序列化+写盘（N 条 = N 次全量写，O(N^2) 字节）
+    dirty = threading.Event()
+    flush_stop = threading.Event()
+
+    def _flusher() -> None:
+        while not flush_stop.is_set():
+            flush_stop.wait(0.5)
+            if dirty.is_set():
+                dirty.clear()
+                with lock:
+                    snap = dict(out_dict)
+                atomic_write_json(out_path, snap)
+
+    flusher: Optional[threading.Thread] = None
+    if out_path and todo:
+        flusher = threading.Thread(target=_flusher, daemon=True)
+        flusher.start()
+
+    # ✅ 崩溃恢复日志：每条成功追加一行 {path: 译文}（O(变更) 字节），终稿写完即删
+    patches_lock = threading.Lock()
+    patches_f = None
+    if out_path and todo:
+        pj = out_path.with_suffix(".patches.jsonl")
+        pj.parent.mkdir(parents=True, exist_ok=True)
+        patches_f = pj.open("a", encoding="utf-8")
 
     def apply_success(seq_no: int, path: str, final: str) -> None:
         nonlocal succeeded
@@ -582,8 +914,13 @@ def translate_tree(
             if isinstance(src_text, str):
                 cache[cache_key(src_lang_name, tgt_code, src_text)] = final
             succeeded += 1
-            if out_path:
-                atomic_write_json(out_path, out_dict)
+        if out_path:
+            dirty.set()
+        if patches_f is not None:
+            line = json.dumps({path: final}, ensure_ascii=False)
+            with patches_lock:
+                patches_f.write(line + "\n")
+                patches_f.flush()
 
         log_translation(tgt_code, path, src_text if isinstance(src_text, str) else "", final)
 
@@ -598,36 +935,94 @@ def translate_tree(
     # =========================
     # 执行：单线程 or 并发
     # =========================
-    if MAX_WORKERS <= 1:
-        for seq_no, path, masked_src in todo:
-            print(f"⏳ [{tgt_code}] start (seq:{seq_no}/{total})  {path}", flush=True)
-            final = translate_one(path, masked_src)
+    def apply_batch(results: List[Tuple[int, str, Optional[str]]]) -> None:
+        for seq_no, path, final in results:
             if final is None:
                 tick_complete(False, seq_no, path)
                 continue
             apply_success(seq_no, path, final)
             tick_complete(True, seq_no, path)
+
+    if MAX_WORKERS <= 1:
+        for items in batches:
+            first_seq = items[0][0]
+            print(f"⏳ [{tgt_code}] start batch {len(items)} 条 (seq:{first_seq}../{total})", flush=True)
+            apply_batch(translate_batch(items))
+    elif ASYNC_MODE:
+        import asyncio
+        from openai import AsyncOpenAI
+
+        async def _run_all() -> None:
+            aclient = AsyncOpenAI(api_key=api_key)
+            sem = asyncio.Semaphore(MAX_WORKERS)
+
+            async def one(items: List[Tuple[int, str, str]]) -> None:
+                batch = [(path, masked_src) for _, path, masked_src in items]
+                async with sem:
+                    # 限速等待挪到工作线程，不卡事件循环
+                    await asyncio.to_thread(
+                        _RATE_LIMITER.acquire, 1, estimate_batch_tokens(batch))
+                    try:
+                        out_map = await call_openai_batch_async(
+                            client=aclient,
+                            model=model,
+                            src_lang_name=src_lang_name,
+                            tgt_lang_name=tgt_lang_name,
+                            tgt_code=tgt_code,
+                            batch=batch,
+                        )
+                    except Exception:
+                        out_map = {}
+                    # ✅ 同步路径同款：部分成功时对漏答的 id 补问一小批
+                    missing = [(p, s) for p, s in batch if p not in out_map]
+                    if out_map and missing:
+                        try:
+                            await asyncio.to_thread(
+                                _RATE_LIMITER.acquire, 1, estimate_batch_tokens(missing))
+                            out_map.update(await call_openai_batch_async(
+                                client=aclient,
+                                model=model,
+                                src_lang_name=src_lang_name,
+                                tgt_lang_name=tgt_lang_name,
+                                tgt_code=tgt_code,
+                                batch=missing,
+                            ))
+                        except Exception:
+                            pass
+                # 后处理/写文件是纯 CPU+本地 IO，直接在事件循环线程做
+                results: List[Tuple[int, str, Optional[str]]] = []
+                for seq_no, path, _ in items:
+                    masked_tgt = out_map.get(path)
+                    final = postprocess(path, masked_tgt) if isinstance(masked_tgt, str) else None
+                    results.append((seq_no, path, final))
+                apply_batch(results)
+
+            try:
+                await asyncio.gather(*(one(items) for items in batches))
+            finally:
+                await aclient.close()
+
+        asyncio.run(_run_all())
     else:
         from concurrent.futures import ThreadPoolExecutor, as_completed
 
-        def worker(seq_no: int, path: str, masked_src: str) -> Tuple[int, str, Optional[str]]:
-            final = translate_one(path, masked_src)
-            return seq_no, path, final
-
         with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
-            futures = [ex.submit(worker, seq_no, path, masked_src) for seq_no, path, masked_src in todo]
+            futures = [ex.submit(translate_batch, items) for items in batches]
             for fut in as_completed(futures):
-                seq_no, path, final = fut.result()
-                if final is None:
-                    tick_complete(False, seq_no, path)
-                    continue
-                apply_success(seq_no, path, final)
-                tick_complete(True, seq_no, path)
-
-    # 最终保险落盘 + 缓存保存交给上层
+                apply_batch(fut.result())
+
+    # 收尾：停掉后台落盘线程；此时 worker 都已结束，没有并发可言——
+    # 只有最后一次快照之后还有新成功（dirty 仍置位）才需要补写终稿。
+    # 终稿在盘上后补丁日志就没用了，删掉
+    if flusher is not None:
+        flush_stop.set()
+        flusher.join()
+    if patches_f is not None:
+        patches_f.close()
     if out_path:
-        with lock:
+        if dirty.is_set():
             atomic_write_json(out_path, out_dict)
+        out_path.with_suffix(".patches.jsonl").unlink(missing_ok=True)
 
     if total > 0:
         print(f"🏁 [{tgt_code}] 完成：成功 {succeeded}/{total}", flush=True)
@@ -647,7 +1042,7 @@ def build_first_hop(locales_dir: Path, api_key: str, force_full: bool, protected
     if not base_path.exists():
         raise FileNotFoundError(f"找不到基础语言文件：{base_path}")
 
-    base_obj = json.loads(base_path.read_text(encoding="utf-8"))
+    base_obj = read_json_file(base_path)
 
     def lang_name(code: str) -> str:
         return (lang_by_code.get(code.lower()).name if code.lower() in lang_by_code else code)
@@ -656,7 +1051,7 @@ def build_first_hop(locales_dir: Path, api_key: str, force_full: bool, protected
         out_path = locale_path(locales_dir, code)
         existing = None
         if out_path.exists() and not force_full:
-            existing = json.loads(out_path.read_text(encoding="utf-8"))
+            existing = read_json_file(out_path)
 
         translate_tree(
             base_obj=base_obj,
@@ -688,7 +1083,7 @@ def build_second_hop_from_en(locales_dir: Path, api_key: str, force_full: bool,
     if not en_path.exists():
         raise RuntimeError("第二阶段需要 en.json，但未找到。请先运行第一阶段生成 en.json。")
 
-    en_obj = json.loads(en_path.read_text(encoding="utf-8"))
+    en_obj = read_json_file(en_path)
 
     excluded_lower = set([BASE.lower()] + [x.lower() for x in FIRST_HOP])
 
@@ -700,21 +1095,23 @@ def build_second_hop_from_en(locales_dir: Path, api_key: str, force_full: bool,
         out_path = locale_path(locales_dir, code)
         existing = None
         if out_path.exists() and not force_full:
-            existing = json.loads(out_path.read_text(encoding="utf-8"))
+            existing = read_json_file(out_path)
 
         # 英语地区码：直接复用 en（不走翻译）
+        # ✅ 内容逐字节相同，直接 copyfile，省掉整份 JSON 的 dumps
         if code.lower().startswith("en-"):
-            write_json_preserve_order(out_path, en_obj)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(en_path, out_path)
             print(f"🟦 复用 en：{out_path}", flush=True)
             continue
 
-        # fallbacks：优先复用（省钱）
+        # fallbacks：优先复用（省钱）；原样照抄，不解析不重排
         reused = False
         for fb in (l.fallbacks or []):
             fb_path = locale_path(locales_dir, fb)
             if fb_path.exists():
-                fb_obj = json.loads(fb_path.read_text(encoding="utf-8"))
-                write_json_preserve_order(out_path, fb_obj)
+                out_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(fb_path, out_path)
                 print(f"🟨 复用 fallback {fb}：{out_path}", flush=True)
                 reused = True
                 break
@@ -761,21 +1158,25 @@ def normalize_key_patterns(raw: str) -> List[Tuple[str, bool]]:
             out.append((p, False))
     return out
 
-def should_remove(path: str, patterns: List[Tuple[str, bool]]) -> bool:
+def compile_key_patterns(patterns: List[Tuple[str, bool]]) -> "re.Pattern[str]":
+    """所有模式合成一个锚定交替正则：每个 key 一次 match 代替逐模式 startswith。
+    前缀模式命中 pat 本身或 pat. / pat[ 开头的子路径，与原 should_remove 语义一致。"""
+    parts = []
     for pat, is_prefix in patterns:
-        if is_prefix:
-            if path == pat or path.startswith(pat + ".") or path.startswith(pat + "["):
-                return True
-        else:
-            if path == pat:
-                return True
-    return False
+        esc = re.escape(pat)
+        parts.append(esc + (r"(?:\.|\[|$)" if is_prefix else r"$"))
+    return re.compile("^(?:" + "|".join(parts) + ")")
+
+
+def should_remove(path: str, pattern_re: "re.Pattern[str]") -> bool:
+    return pattern_re.match(path) is not None
 
 def clean_translations_by_key(locales_dir: Path, key_patterns_raw: str) -> None:
     patterns = normalize_key_patterns(key_patterns_raw)
     if not patterns:
         print("未提供有效 key。", flush=True)
         return
+    pattern_re = compile_key_patterns(patterns)
 
     base_name = code_to_filename(BASE)
     files = [p for p in locales_dir.glob("*.json") if p.name != base_name]
@@ -784,26 +1185,34 @@ def clean_translations_by_key(locales_dir: Path, key_patterns_raw: str) -> None:
         print("没有可清理的翻译文件（除 base 外）。", flush=True)
         return
 
-    total_removed = 0
-    for fp in files:
-        obj = json.loads(fp.read_text(encoding="utf-8"))
+    def _clean_one(fp: Path) -> int:
+        obj = read_json_file(fp)
         flat = flatten_json(obj)
 
         kept: List[Tuple[str, Any]] = []
         removed = 0
         for path, val in flat:
-            if should_remove(path, patterns):
+            if should_remove(path, pattern_re):
                 removed += 1
                 continue
             kept.append((path, val))
 
         if removed > 0:
-            total_removed += removed
             new_obj = pairs_to_flat_dict(kept)  # 仍然写平铺 JSON
             write_json_preserve_order(fp, new_obj)
             print(f"🧽 {fp.name}: 删除 {removed} 项", flush=True)
         else:
             print(f"🧼 {fp.name}: 无匹配项，跳过", flush=True)
+        return removed
+
+    # 同 sort_locales：每个文件独立，线程池并行清理
+    if MAX_WORKERS > 1 and len(files) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            total_removed = sum(ex.map(_clean_one, files))
+    else:
+        total_removed = sum(_clean_one(fp) for fp in files)
 
     print(f"✅ 清理完成：共删除 {total_removed} 项（不影响 {base_name}）", flush=True)
 
@@ -817,7 +1226,7 @@ def remove_keys_not_in_base(locales_dir: Path) -> None:
     if not base_path.exists():
         raise FileNotFoundError(f"找不到基础语言文件：{base_path}")
 
-    base_obj = json.loads(base_path.read_text(encoding="utf-8"))
+    base_obj = read_json_file(base_path)
     base_pairs = flatten_json(base_obj)
     base_key_set = {p for p, _ in base_pairs}
 
@@ -831,7 +1240,7 @@ def remove_keys_not_in_base(locales_dir: Path) -> None:
     total_files_changed = 0
 
     for fp in files:
-        obj = json.loads(fp.read_text(encoding="utf-8"))
+        obj = read_json_file(fp)
         flat = flatten_json(obj)
 
         kept: List[Tuple[str, Any]] = []
@@ -862,13 +1271,14 @@ def remove_keys_not_in_base(locales_dir: Path) -> None:
 # - 输出仍然是平铺 JSON（不分级）
 # =========================
 def sort_locale_file(path: Path) -> int:
-    obj = json.loads(path.read_text(encoding="utf-8"))
+    obj = read_json_file(path)
     pairs = flatten_json(obj)
-    before = [p for p, _ in pairs]
-    pairs.sort(key=lambda x: path_sort_key(x[0]))
-    after = [p for p, _ in pairs]
-    changed = 1 if before != after else 0
-    sorted_obj = pairs_to_flat_dict(pairs)
+    # 装饰一次排序 key；sorted 返回的是同一批 tuple，
+    # 按 identity 对位就能判断顺序有没有变，省掉 before/after 两份 key 列表再整列表比较
+    keyed = [(path_sort_key(p), p, v) for p, v in pairs]
+    sorted_keyed = sorted(keyed, key=lambda x: x[0])
+    changed = 1 if any(a is not b for a, b in zip(keyed, sorted_keyed)) else 0
+    sorted_obj = pairs_to_flat_dict([(p, v) for _, p, v in sorted_keyed])
     write_json_preserve_order(path, sorted_obj)
     return changed
 
@@ -879,10 +1289,19 @@ def sort_locales(locales_dir: Path, include_base: bool = False) -> None:
         print("没有可排序的 json 文件。", flush=True)
         return
 
-    changed_count = 0
-    for fp in files:
-        changed_count += sort_locale_file(fp)
+    def _sort_one(fp: Path) -> int:
+        n = sort_locale_file(fp)
         print(f"🔧 已排序：{fp.name}", flush=True)
+        return n
+
+    # 文件之间互相独立（各写各的路径），线程池重叠 读取/解析/写盘
+    if MAX_WORKERS > 1 and len(files) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            changed_count = sum(ex.map(_sort_one, files))
+    else:
+        changed_count = sum(_sort_one(fp) for fp in files)
     print(f"✅ 排序完成：处理 {len(files)} 个文件，其中顺序发生变化的 {changed_count} 个", flush=True)
 
 